@@ -48,28 +48,30 @@ def main():
         payment_requirements_selector=custom_payment_selector,
     )
 
-    # Make request
-    try:
-        print(f"Making request to {endpoint_path}")
-        response = session.get(f"{base_url}{endpoint_path}")
-
-        # Read the response content
-        content = response.content
-        print(f"Response: {content.decode()}")
-
-        # Check for payment response header
-        if "X-Payment-Response" in response.headers:
-            payment_response = decode_x_payment_response(
-                response.headers["X-Payment-Response"]
-            )
-            print(
-                f"Payment response transaction hash: {payment_response['transaction']}"
-            )
-        else:
-            print("Warning: No payment response header found")
-
-    except Exception as e:
-        print(f"Error occurred: {str(e)}")
+    # Reuse the session so repeated requests share pooled keep-alive connections
+    with session:
+        for i in range(3):
+            try:
+                print(f"Making request {i + 1} to {endpoint_path}")
+                response = session.get(f"{base_url}{endpoint_path}")
+
+                # Read the response content
+                content = response.content
+                print(f"Response: {content.decode()}")
+
+                # Check for payment response header
+                if "X-Payment-Response" in response.headers:
+                    payment_response = decode_x_payment_response(
+                        response.headers["X-Payment-Response"]
+                    )
+                    print(
+                        f"Payment response transaction hash: {payment_response['transaction']}"
+                    )
+                else:
+                    print("Warning: No payment response header found")
+
+            except Exception as e:
+                print(f"Error occurred: {str(e)}")
 
 
 if __name__ == "__main__":
@@ -1,9 +1,10 @@
 import os
+from contextlib import asynccontextmanager
 from typing import Any, Dict
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
-from x402.fastapi.middleware import require_payment
+from fastapi import APIRouter, FastAPI
+from x402.fastapi.middleware import require_payment, require_payment_route
 from x402.types import EIP712Domain, TokenAmount, TokenAsset
 
 # Load environment variables
@@ -15,37 +16,45 @@ ADDRESS = os.getenv("ADDRESS")
 if not ADDRESS:
     raise ValueError("Missing required environment variables")
 
-app = FastAPI()
-
-# Apply payment middleware to specific routes
-app.middleware("http")(
-    require_payment(
-        path="/weather",
-        price="$0.001",
-        pay_to_address=ADDRESS,
-        network="base-sepolia",
-    )
+# Payment-gated route class: only routes registered on this router are checked
+WeatherPaymentRoute = require_payment_route(
+    price="$0.001",
+    pay_to_address=ADDRESS,
+    network="base-sepolia",
 )
+weather_router = APIRouter(route_class=WeatherPaymentRoute)
 
-# Apply payment middleware to premium routes
-app.middleware("http")(
-    require_payment(
-        path="/premium/*",
-        price=TokenAmount(
-            amount="10000",
-            asset=TokenAsset(
-                address="0x036CbD53842c5426634e7929541eC2318f3dCF7e",
-                decimals=6,
-                eip712=EIP712Domain(name="USDC", version="2"),
-            ),
+# Payment middleware for premium routes
+premium_payment = require_payment(
+    path="/premium/*",
+    price=TokenAmount(
+        amount="10000",
+        asset=TokenAsset(
+            address="0x036CbD53842c5426634e7929541eC2318f3dCF7e",
+            decimals=6,
+            eip712=EIP712Domain(name="USDC", version="2"),
         ),
-        pay_to_address=ADDRESS,
-        network="base-sepolia",
-    )
+    ),
+    pay_to_address=ADDRESS,
+    network="base-sepolia",
 )
 
 
-@app.get("/weather")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close the pooled facilitator connections on shutdown
+    await WeatherPaymentRoute.facilitator.aclose()
+    await premium_payment.facilitator.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Apply payment middleware
+app.middleware("http")(premium_payment)
+
+
+@weather_router.get("/weather")
 async def get_weather() -> Dict[str, Any]:
     return {
         "report": {
@@ -55,6 +64,9 @@ async def get_weather() -> Dict[str, Any]:
     }
 
 
+app.include_router(weather_router)
+
+
 @app.get("/premium/content")
 async def get_premium_content() -> Dict[str, Any]:
     return {
@@ -1,3 +1,6 @@
+from functools import lru_cache
+from typing import Any
+
 NETWORK_TO_ID = {
     "base-sepolia": "84532",
     "base": "8453",
@@ -6,6 +9,7 @@ NETWORK_TO_ID = {
 }
 
 
+@lru_cache(maxsize=None)
 def get_chain_id(network: str) -> str:
     """Get the chain ID for a given network
     Supports string encoded chain IDs and human readable networks
@@ -20,7 +24,7 @@ def get_chain_id(network: str) -> str:
     return NETWORK_TO_ID[network]
 
 
-KNOWN_TOKENS = {
+KNOWN_TOKENS: dict[str, list[dict[str, Any]]] = {
     "84532": [
         {
             "human_name": "usdc",
@@ -60,6 +64,7 @@ KNOWN_TOKENS = {
 }
 
 
+@lru_cache(maxsize=None)
 def get_token_name(chain_id: str, address: str) -> str:
     """Get the token name for a given chain and address"""
     for token in KNOWN_TOKENS[chain_id]:
@@ -68,6 +73,7 @@ def get_token_name(chain_id: str, address: str) -> str:
     raise ValueError(f"Token not found for chain {chain_id} and address {address}")
 
 
+@lru_cache(maxsize=None)
 def get_token_version(chain_id: str, address: str) -> str:
     """Get the token version for a given chain and address"""
     for token in KNOWN_TOKENS[chain_id]:
@@ -76,6 +82,7 @@ def get_token_version(chain_id: str, address: str) -> str:
     raise ValueError(f"Token not found for chain {chain_id} and address {address}")
 
 
+@lru_cache(maxsize=None)
 def get_token_decimals(chain_id: str, address: str) -> int:
     """Get the token decimals for a given chain and address"""
     for token in KNOWN_TOKENS[chain_id]:
@@ -84,9 +91,17 @@ def get_token_decimals(chain_id: str, address: str) -> int:
     raise ValueError(f"Token not found for chain {chain_id} and address {address}")
 
 
+# Default token address by (chain ID, token type), resolved once from the known token list
+_DEFAULT_TOKEN_ADDRESSES = {
+    (chain_id, token["human_name"]): token["address"]
+    for chain_id, tokens in KNOWN_TOKENS.items()
+    for token in tokens
+}
+
+
 def get_default_token_address(chain_id: str, token_type: str = "usdc") -> str:
     """Get the default token address for a given chain and token type"""
-    for token in KNOWN_TOKENS[chain_id]:
-        if token["human_name"] == token_type:
-            return token["address"]
-    raise ValueError(f"Token type '{token_type}' not found for chain {chain_id}")
+    try:
+        return _DEFAULT_TOKEN_ADDRESSES[(chain_id, token_type)]
+    except KeyError:
+        raise ValueError(f"Token type '{token_type}' not found for chain {chain_id}")
@@ -8,8 +8,8 @@ from x402.types import (
 )
 from x402.common import x402_VERSION
 import secrets
-from x402.encoding import safe_base64_decode
-import json
+from x402.encoding import safe_base64_decode_bytes
+from pydantic_core import from_json
 
 # Define type for the payment requirements selector
 PaymentSelectorCallable = Callable[
@@ -31,9 +31,8 @@ def decode_x_payment_response(header: str) -> Dict[str, Any]:
         - network: str
         - payer: str (address)
     """
-    decoded = safe_base64_decode(header)
-    result = json.loads(decoded)
-    return result
+    # Parse the decoded bytes directly, without a utf-8 str in between
+    return from_json(safe_base64_decode_bytes(header))
 
 
 class PaymentError(Exception):
@@ -2,6 +2,7 @@ from typing import Optional
 import requests
 import json
 from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from eth_account import Account
 from x402.clients.base import (
     x402Client,
@@ -125,11 +126,17 @@ def x402_requests(
         payment_requirements_selector: Optional custom selector for payment requirements.
             Should be a callable that takes (accepts, network_filter, scheme_filter, max_value)
             and returns a PaymentRequirements object.
-        **kwargs: Additional arguments to pass to HTTPAdapter
+        **kwargs: Additional arguments to pass to HTTPAdapter. Defaults to a pool of
+            20 connections per host and 2 retries on connection errors.
 
     Returns:
-        Session with x402 payment handling configured
+        Session with x402 payment handling configured. Reuse it across requests so
+        pooled keep-alive connections save a TCP and TLS handshake per call.
     """
+    kwargs.setdefault("pool_connections", 10)
+    kwargs.setdefault("pool_maxsize", 20)
+    kwargs.setdefault("max_retries", Retry(total=2, backoff_factor=0.2))
+
     session = requests.Session()
     adapter = x402_http_adapter(
         account,
@@ -1,16 +1,43 @@
 from decimal import Decimal
+from functools import lru_cache
 from typing import List, Optional
 
 from x402.chains import (
+    KNOWN_TOKENS,
     get_chain_id,
-    get_token_decimals,
-    get_token_name,
-    get_token_version,
     get_default_token_address,
+    get_token_decimals,
 )
+from x402.encoding import safe_base64_decode_bytes
 from x402.types import Price, TokenAmount, PaymentRequirements, PaymentPayload
 
 
+# USDC (address, decimals, EIP-712 name, EIP-712 version) by chain ID, resolved
+# once from the known token list
+_USDC_META: dict[str, tuple[str, int, str, str]] = {
+    chain_id: (token["address"], token["decimals"], token["name"], token["version"])
+    for chain_id, tokens in KNOWN_TOKENS.items()
+    for token in tokens
+    if token["human_name"] == "usdc"
+}
+
+
+def _to_atomic_amount(amount: str, decimals: int) -> int:
+    """Convert a decimal amount string to atomic units, truncating extra precision
+
+    Plain amounts like "1", "0.001" or ".5" are converted with integer arithmetic;
+    anything else (signs, exponents, whitespace) falls back to Decimal.
+    """
+    whole, _, frac = amount.partition(".")
+    if (whole.isdecimal() or (whole == "" and frac != "")) and (
+        frac == "" or frac.isdecimal()
+    ):
+        return int(whole or 0) * 10**decimals + int(
+            frac[:decimals].ljust(decimals, "0") or 0
+        )
+    return int(Decimal(amount) * Decimal(10**decimals))
+
+
 def parse_money(amount: str | int, address: str, network: str) -> int:
     """Parse money string or int into int
 
@@ -20,12 +47,10 @@ def parse_money(amount: str | int, address: str, network: str) -> int:
     if isinstance(amount, str):
         if amount.startswith("$"):
             amount = amount[1:]
-        decimal_amount = Decimal(amount)
 
         chain_id = get_chain_id(network)
         decimals = get_token_decimals(chain_id, address)
-        decimal_amount = decimal_amount * Decimal(10**decimals)
-        return int(decimal_amount)
+        return _to_atomic_amount(amount, decimals)
     return amount
 
 
@@ -49,21 +74,17 @@ def process_price_to_atomic_amount(
         try:
             if isinstance(price, str) and price.startswith("$"):
                 price = price[1:]
-            amount = Decimal(str(price))
 
-            # Get USDC address for the network
+            # Get USDC address, decimals and EIP-712 domain info for the network
             chain_id = get_chain_id(network)
-            asset_address = get_usdc_address(chain_id)
-            decimals = get_token_decimals(chain_id, asset_address)
+            if chain_id not in _USDC_META:
+                raise ValueError(f"Token type 'usdc' not found for chain {chain_id}")
+            asset_address, decimals, name, version = _USDC_META[chain_id]
 
             # Convert to atomic units
-            atomic_amount = int(amount * Decimal(10**decimals))
+            atomic_amount = _to_atomic_amount(str(price), decimals)
 
-            # Get EIP-712 domain info
-            eip712_domain = {
-                "name": get_token_name(chain_id, asset_address),
-                "version": get_token_version(chain_id, asset_address),
-            }
+            eip712_domain = {"name": name, "version": version}
 
             return str(atomic_amount), asset_address, eip712_domain
 
@@ -87,8 +108,7 @@ def process_price_to_atomic_amount(
 
 def get_usdc_address(chain_id: int | str) -> str:
     """Get the USDC contract address for a given chain ID"""
-    chain_id_str = str(chain_id)  # Convert to string for consistency
-    return get_default_token_address(chain_id_str, "usdc")
+    return get_default_token_address(str(chain_id))  # Convert to string for consistency
 
 
 def find_matching_payment_requirements(
@@ -111,4 +131,25 @@ def find_matching_payment_requirements(
     return None
 
 
+@lru_cache(maxsize=1024)
+def decode_payment_header(payment_header: str) -> PaymentPayload:
+    """
+    Decodes and validates a base64 encoded X-PAYMENT header.
+
+    Results are cached by the raw header, so retried or polled requests carrying
+    the same header skip the base64 decode and model validation. The returned
+    payload is shared between callers and must not be mutated.
+
+    Args:
+        payment_header: The X-PAYMENT header value
+
+    Returns:
+        The decoded payment payload
+
+    Raises:
+        ValueError: If the header is not valid base64 or not a valid payment payload
+    """
+    return PaymentPayload.model_validate_json(safe_base64_decode_bytes(payment_header))
+
+
 x402_VERSION = 1
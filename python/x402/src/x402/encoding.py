@@ -1,6 +1,11 @@
-import base64
 from typing import Union
 
+try:
+    # SIMD-accelerated drop-in for the stdlib codecs (`pip install x402[speedups]`)
+    from pybase64 import b64decode, b64encode
+except ImportError:  # pragma: no cover - depends on the environment
+    from base64 import b64decode, b64encode
+
 
 def safe_base64_encode(data: Union[str, bytes]) -> str:
     """Safely encode string or bytes to base64 string.
@@ -13,7 +18,7 @@ def safe_base64_encode(data: Union[str, bytes]) -> str:
     """
     if isinstance(data, str):
         data = data.encode("utf-8")
-    return base64.b64encode(data).decode("utf-8")
+    return b64encode(data).decode("utf-8")
 
 
 def safe_base64_decode(data: str) -> str:
@@ -25,4 +30,19 @@ def safe_base64_decode(data: str) -> str:
     Returns:
         Decoded utf-8 string
     """
-    return base64.b64decode(data).decode("utf-8")
+    return b64decode(data).decode("utf-8")
+
+
+def safe_base64_decode_bytes(data: Union[str, bytes]) -> bytes:
+    """Safely decode base64 string or bytes to raw bytes.
+
+    Useful when the decoded data is parsed directly, e.g. by pydantic's JSON
+    validation, which skips a round-trip through a utf-8 string.
+
+    Args:
+        data: Base64 encoded string or bytes
+
+    Returns:
+        Decoded bytes
+    """
+    return b64decode(data)
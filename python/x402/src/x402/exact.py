@@ -5,7 +5,8 @@ from typing_extensions import (
     TypedDict,
 )  # use `typing_extensions.TypedDict` instead of `typing.TypedDict` on Python < 3.12
 from eth_account import Account
-from x402.encoding import safe_base64_encode, safe_base64_decode
+from pydantic_core import from_json
+from x402.encoding import safe_base64_encode, safe_base64_decode_bytes
 from x402.types import (
     PaymentRequirements,
 )
@@ -127,4 +128,4 @@ def encode_payment(payment_payload: Dict[str, Any]) -> str:
 
 def decode_payment(encoded_payment: str) -> Dict[str, Any]:
     """Decode a base64 encoded payment string back into a PaymentPayload object."""
-    return json.loads(safe_base64_decode(encoded_payment))
+    return from_json(safe_base64_decode_bytes(encoded_payment))
@@ -1,4 +1,6 @@
-from typing import Callable, Optional
+import importlib.util
+import os
+from typing import Any, Callable, Optional, Union
 from typing_extensions import (
     TypedDict,
 )  # use `typing_extensions.TypedDict` instead of `typing.TypedDict` on Python < 3.12
@@ -23,6 +25,19 @@ class FacilitatorConfig(TypedDict, total=False):
     create_headers: Callable[[], dict[str, dict[str, str]]]
 
 
+# HTTP/2 needs the optional `h2` package (`pip install x402[http2]`)
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def _requirements_for_facilitator(
+    payment_requirements: Union[PaymentRequirements, dict[str, Any]],
+) -> dict[str, Any]:
+    """Serialize payment requirements for a facilitator request body"""
+    if isinstance(payment_requirements, dict):
+        return payment_requirements
+    return payment_requirements.model_dump(by_alias=True, exclude_none=True)
+
+
 class FacilitatorClient:
     def __init__(self, config: Optional[FacilitatorConfig] = None):
         if config is None:
@@ -35,56 +50,125 @@ class FacilitatorClient:
         if url.endswith("/"):
             url = url[:-1]
 
-        self.config = {"url": url, "create_headers": config.get("create_headers")}
+        self.config: dict[str, Any] = {
+            "url": url,
+            "create_headers": config.get("create_headers"),
+        }
+
+        # A single long-lived client so verify and settle reuse pooled
+        # keep-alive connections instead of a new TCP+TLS handshake per call.
+        # httpx closes idle connections after 5s by default, which is often
+        # shorter than the gap between verify and settle on slow routes.
+        keepalive_expiry = float(os.getenv("X402_HTTPX_KEEPALIVE", "15"))
+        self._client = httpx.AsyncClient(
+            base_url=url,
+            headers={"Content-Type": "application/json"},
+            http2=_HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=20,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            follow_redirects=True,
+        )
+
+    async def aclose(self) -> None:
+        """Close the underlying HTTP client and its pooled connections"""
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "FacilitatorClient":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+    async def _create_headers(self) -> dict[str, dict[str, str]]:
+        if self.config.get("create_headers"):
+            return await self.config["create_headers"]()
+        return {}
+
+    async def _post(
+        self, path: str, body: dict[str, Any], headers: dict[str, str]
+    ) -> bytes:
+        # Read the body inside the stream context so the connection goes back
+        # to the pool even if reading fails or the task is cancelled
+        async with self._client.stream(
+            "POST", path, json=body, headers=headers
+        ) as response:
+            return await response.aread()
+
+    @staticmethod
+    def _request_body(
+        payment: PaymentPayload,
+        payment_requirements: Union[PaymentRequirements, dict[str, Any]],
+    ) -> dict[str, Any]:
+        return {
+            "x402Version": payment.x402_version,
+            "paymentPayload": payment.model_dump(by_alias=True),
+            "paymentRequirements": _requirements_for_facilitator(payment_requirements),
+        }
 
     async def verify(
-        self, payment: PaymentPayload, payment_requirements: PaymentRequirements
+        self,
+        payment: PaymentPayload,
+        payment_requirements: Union[PaymentRequirements, dict[str, Any]],
     ) -> VerifyResponse:
-        """Verify a payment header is valid and a request should be processed"""
-        headers = {"Content-Type": "application/json"}
+        """Verify a payment header is valid and a request should be processed
 
-        if self.config.get("create_headers"):
-            custom_headers = await self.config["create_headers"]()
-            headers.update(custom_headers.get("verify", {}))
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.config['url']}/verify",
-                json={
-                    "x402Version": payment.x402_version,
-                    "paymentPayload": payment.model_dump(by_alias=True),
-                    "paymentRequirements": payment_requirements.model_dump(
-                        by_alias=True, exclude_none=True
-                    ),
-                },
-                headers=headers,
-                follow_redirects=True,
-            )
-
-            data = response.json()
-            return VerifyResponse(**data)
+        `payment_requirements` may also be passed pre-serialized (by alias, without
+        None values), which lets callers reuse one dump across requests.
+        """
+        custom_headers = await self._create_headers()
+        content = await self._post(
+            "/verify",
+            self._request_body(payment, payment_requirements),
+            custom_headers.get("verify", {}),
+        )
+        return VerifyResponse.model_validate_json(content)
 
     async def settle(
-        self, payment: PaymentPayload, payment_requirements: PaymentRequirements
+        self,
+        payment: PaymentPayload,
+        payment_requirements: Union[PaymentRequirements, dict[str, Any]],
     ) -> SettleResponse:
-        headers = {"Content-Type": "application/json"}
+        """Settle a verified payment
 
-        if self.config.get("create_headers"):
-            custom_headers = await self.config["create_headers"]()
-            headers.update(custom_headers.get("settle", {}))
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.config['url']}/settle",
-                json={
-                    "x402Version": payment.x402_version,
-                    "paymentPayload": payment.model_dump(by_alias=True),
-                    "paymentRequirements": payment_requirements.model_dump(
-                        by_alias=True, exclude_none=True
-                    ),
-                },
-                headers=headers,
-                follow_redirects=True,
-            )
-            data = response.json()
-            return SettleResponse(**data)
+        `payment_requirements` may also be passed pre-serialized, as for `verify`.
+        """
+        custom_headers = await self._create_headers()
+        content = await self._post(
+            "/settle",
+            self._request_body(payment, payment_requirements),
+            custom_headers.get("settle", {}),
+        )
+        return SettleResponse.model_validate_json(content)
+
+    async def verify_and_settle(
+        self,
+        payment: PaymentPayload,
+        payment_requirements: Union[PaymentRequirements, dict[str, Any]],
+    ) -> tuple[VerifyResponse, Optional[SettleResponse]]:
+        """Verify a payment and, if it is valid, settle it straight away
+
+        For integrations that settle before doing the paid work. The request body
+        is serialized and `create_headers` is called once for both calls, and
+        settle goes out on the connection verify just used. Returns None for the
+        settle response when the payment is invalid. Middleware that must only
+        settle after a successful response should call `verify` and `settle`
+        separately.
+        """
+        custom_headers = await self._create_headers()
+        body = self._request_body(payment, payment_requirements)
+
+        verify_content = await self._post(
+            "/verify", body, custom_headers.get("verify", {})
+        )
+        verify_response = VerifyResponse.model_validate_json(verify_content)
+        if not verify_response.is_valid:
+            return verify_response, None
+
+        settle_content = await self._post(
+            "/settle", body, custom_headers.get("settle", {})
+        )
+        return verify_response, SettleResponse.model_validate_json(settle_content)
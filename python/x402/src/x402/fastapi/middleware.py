@@ -1,32 +1,34 @@
-import base64
-import json
 import logging
 from typing import Any, Callable, Optional, get_args, cast
 
 from fastapi import Request
-from fastapi.responses import JSONResponse, HTMLResponse
-from pydantic import validate_call
+from fastapi.routing import APIRoute
+from fastapi.responses import HTMLResponse, Response
+from pydantic import TypeAdapter, validate_call
+from pydantic_core import to_json
 
 from x402.common import (
+    decode_payment_header,
     process_price_to_atomic_amount,
     x402_VERSION,
-    find_matching_payment_requirements,
 )
-from x402.encoding import safe_base64_decode
+from x402.encoding import safe_base64_encode
 from x402.facilitator import FacilitatorClient, FacilitatorConfig
-from x402.path import path_is_match
+from x402.path import compile_path_matcher
 from x402.paywall import is_browser_request, get_paywall_html
 from x402.types import (
-    PaymentPayload,
     PaymentRequirements,
     Price,
-    x402PaymentRequiredResponse,
     PaywallConfig,
+    SettleResponse,
     SupportedNetworks,
 )
 
 logger = logging.getLogger(__name__)
 
+# Serializes straight to JSON bytes, without an intermediate str
+_settle_response_adapter = TypeAdapter(SettleResponse)
+
 
 @validate_call
 def require_payment(
@@ -64,7 +66,10 @@ def require_payment(
         custom_paywall_html (Optional[str], optional): Custom HTML to display for paywall instead of default.
 
     Returns:
-        Callable: FastAPI middleware function that checks for valid payment before processing requests
+        Callable: FastAPI middleware function that checks for valid payment before processing requests.
+            Its `facilitator` attribute holds the underlying FacilitatorClient, which keeps a pooled
+            HTTP connection open and should be closed with `await middleware.facilitator.aclose()`
+            on application shutdown.
     """
 
     # Validate network is supported
@@ -83,33 +88,54 @@ def require_payment(
 
     facilitator = FacilitatorClient(facilitator_config)
 
+    path_matcher = compile_path_matcher(path)
+
+    # Ensure output_schema and extra are objects, not null
+    output_schema_obj = {} if output_schema is None else output_schema
+
+    # Construct payment details once; only the resource can vary per request
+    base_payment_requirements = PaymentRequirements(
+        scheme="exact",
+        network=cast(SupportedNetworks, network),
+        asset=asset_address,
+        max_amount_required=max_amount_required,
+        resource=resource or "",
+        description=description,
+        mime_type=mime_type,
+        pay_to=pay_to_address,
+        max_timeout_seconds=max_deadline_seconds,
+        output_schema=output_schema_obj,
+        extra=eip712_domain,
+    )
+
+    # Serialize once: the 402 body lists every field, while the facilitator
+    # payload omits unset (None) values
+    base_requirements_dict = base_payment_requirements.model_dump(by_alias=True)
+    base_facilitator_requirements_dict = base_payment_requirements.model_dump(
+        by_alias=True, exclude_none=True
+    )
+
     async def middleware(request: Request, call_next: Callable):
         # Skip if the path is not the same as the path in the middleware
-        if not path_is_match(path, request.url.path):
+        if not path_matcher(request.url.path):
             return await call_next(request)
 
-        # Get resource URL if not explicitly provided
-        resource_url = resource or str(request.url)
-
-        # Ensure output_schema and extra are objects, not null
-        output_schema_obj = {} if output_schema is None else output_schema
-
-        # Construct payment details
-        payment_requirements = [
-            PaymentRequirements(
-                scheme="exact",
-                network=cast(SupportedNetworks, network),
-                asset=asset_address,
-                max_amount_required=max_amount_required,
-                resource=resource_url,
-                description=description,
-                mime_type=mime_type,
-                pay_to=pay_to_address,
-                max_timeout_seconds=max_deadline_seconds,
-                output_schema=output_schema_obj,
-                extra=eip712_domain,
-            )
-        ]
+        # Use the request URL as the resource if not explicitly provided
+        if resource:
+            resource_url = resource
+            requirements_dict = base_requirements_dict
+            facilitator_requirements_dict = base_facilitator_requirements_dict
+        else:
+            # Each middleware gets its own Request, so memoize the rendered URL
+            # on the shared ASGI scope for any other payment middleware
+            resource_url = request.scope.get("x402.resource_url")
+            if resource_url is None:
+                resource_url = request.scope["x402.resource_url"] = str(request.url)
+            requirements_dict = {**base_requirements_dict, "resource": resource_url}
+            facilitator_requirements_dict = {
+                **base_facilitator_requirements_dict,
+                "resource": resource_url,
+            }
 
         def x402_response(error: str):
             """Create a 402 response with payment requirements."""
@@ -118,7 +144,7 @@ def require_payment(
 
             if is_browser_request(request_headers):
                 html_content = custom_paywall_html or get_paywall_html(
-                    error, payment_requirements, paywall_config
+                    error, [requirements_dict], paywall_config
                 )
                 headers = {"Content-Type": "text/html; charset=utf-8"}
 
@@ -128,17 +154,17 @@ def require_payment(
                     headers=headers,
                 )
             else:
-                response_data = x402PaymentRequiredResponse(
-                    x402_version=x402_VERSION,
-                    accepts=payment_requirements,
-                    error=error,
-                ).model_dump(by_alias=True)
-                headers = {"Content-Type": "application/json"}
-
-                return JSONResponse(
-                    content=response_data,
+                response_data = {
+                    "x402Version": x402_VERSION,
+                    "accepts": [requirements_dict],
+                    "error": error,
+                }
+
+                # pydantic-core encodes straight to bytes, skipping stdlib json
+                return Response(
+                    content=to_json(response_data),
                     status_code=status_code,
-                    headers=headers,
+                    media_type="application/json",
                 )
 
         # Check for payment header
@@ -149,25 +175,26 @@ def require_payment(
 
         # Decode payment header
         try:
-            payment_dict = json.loads(safe_base64_decode(payment_header))
-            payment = PaymentPayload(**payment_dict)
+            payment = decode_payment_header(payment_header)
         except Exception as e:
             logger.warning(
                 f"Invalid payment header format from {request.client.host if request.client else 'unknown'}: {str(e)}"
             )
             return x402_response("Invalid payment header format")
 
-        # Find matching payment requirements
-        selected_payment_requirements = find_matching_payment_requirements(
-            payment_requirements, payment
-        )
-
-        if not selected_payment_requirements:
+        # Only one set of requirements is offered, so match it directly
+        if payment.scheme != "exact" or payment.network != network:
             return x402_response("No matching payment requirements found")
+        # Only paid requests need a model instance, for `request.state`
+        selected_payment_requirements = (
+            base_payment_requirements
+            if resource
+            else base_payment_requirements.model_copy(update={"resource": resource_url})
+        )
 
         # Verify payment
         verify_response = await facilitator.verify(
-            payment, selected_payment_requirements
+            payment, facilitator_requirements_dict
         )
 
         if not verify_response.is_valid:
@@ -187,12 +214,12 @@ def require_payment(
         # Settle the payment
         try:
             settle_response = await facilitator.settle(
-                payment, selected_payment_requirements
+                payment, facilitator_requirements_dict
             )
             if settle_response.success:
-                response.headers["X-PAYMENT-RESPONSE"] = base64.b64encode(
-                    settle_response.model_dump_json(by_alias=True).encode("utf-8")
-                ).decode("utf-8")
+                response.headers["X-PAYMENT-RESPONSE"] = safe_base64_encode(
+                    _settle_response_adapter.dump_json(settle_response, by_alias=True)
+                )
             else:
                 return x402_response(
                     "Settle failed: "
@@ -203,4 +230,38 @@ def require_payment(
 
         return response
 
+    middleware.facilitator = facilitator  # type: ignore[attr-defined]
+
     return middleware
+
+
+def require_payment_route(**kwargs: Any) -> type[APIRoute]:
+    """Generate a FastAPI route class that gates payments for the routes using it.
+
+    Unlike `require_payment` installed with `app.middleware("http")`, the payment check
+    only runs once a request has been routed to a paid endpoint, so unpaid routes pay
+    no per-request cost. Settlement still happens after the endpoint returns a 2xx
+    response and the X-PAYMENT-RESPONSE header is added to it.
+
+    Args:
+        **kwargs: Same arguments as `require_payment`, except `path`.
+
+    Returns:
+        type[APIRoute]: Route class to pass as `route_class` to an `APIRouter`. Its
+            `facilitator` attribute holds the underlying FacilitatorClient, which should
+            be closed with `await route_class.facilitator.aclose()` on application shutdown.
+    """
+    middleware = require_payment(path="*", **kwargs)
+
+    class PaymentRoute(APIRoute):
+        facilitator = middleware.facilitator  # type: ignore[attr-defined]
+
+        def get_route_handler(self) -> Callable:
+            route_handler = super().get_route_handler()
+
+            async def payment_route_handler(request: Request):
+                return await middleware(request, route_handler)
+
+            return payment_route_handler
+
+    return PaymentRoute
@@ -1,44 +1,119 @@
-import base64
-import json
-from typing import Any, Dict, Optional, Union, get_args, cast
-from flask import Flask, request, g
-from x402.path import path_is_match
+import asyncio
+import atexit
+import itertools
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Union, get_args, cast
+from flask import Flask, g
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from werkzeug.exceptions import HTTPException
+from werkzeug.wsgi import ClosingIterator, get_path_info
+from x402.path import compile_path_dispatcher
 from x402.types import (
     Price,
-    PaymentPayload,
     PaymentRequirements,
-    x402PaymentRequiredResponse,
     PaywallConfig,
+    SettleResponse,
     SupportedNetworks,
 )
 from x402.common import (
+    decode_payment_header,
     process_price_to_atomic_amount,
     x402_VERSION,
-    find_matching_payment_requirements,
 )
-from x402.encoding import safe_base64_decode
+from x402.encoding import safe_base64_encode
 from x402.facilitator import FacilitatorClient, FacilitatorConfig
 from x402.paywall import is_browser_request, get_paywall_html
 
+logger = logging.getLogger(__name__)
+
+# Serializes straight to JSON bytes, without an intermediate str
+_settle_response_adapter = TypeAdapter(SettleResponse)
+
+# Stand-ins for the per-request values of the 402 JSON body; configured values
+# containing them are rejected when the body is pre-encoded
+_RESOURCE_PLACEHOLDER = "\x00x402-resource\x00"
+_ERROR_PLACEHOLDER = "\x00x402-error\x00"
+
+# Status line and headers shared by every 402 response
+_STATUS_402 = "402 Payment Required"
+_CONTENT_TYPE_JSON = ("Content-Type", "application/json")
+_CONTENT_TYPE_HTML = ("Content-Type", "text/html; charset=utf-8")
+_X_PAYMENT_RESPONSE = "X-PAYMENT-RESPONSE"
+
+# WSGI environ key of the X-PAYMENT request header
+_X_PAYMENT = "HTTP_X_PAYMENT"
+
+
+def _encode_402_body_template(requirements_dict: dict[str, Any]) -> list[bytes]:
+    """Pre-encode a 402 JSON body around its resource and error values.
+
+    Returns the three encoded chunks that surround the JSON-encoded resource
+    URL and error message in the final body.
+    """
+    body = to_json(
+        {
+            "x402Version": x402_VERSION,
+            "accepts": [{**requirements_dict, "resource": _RESOURCE_PLACEHOLDER}],
+            "error": _ERROR_PLACEHOLDER,
+        }
+    )
+    resource_marker = to_json(_RESOURCE_PLACEHOLDER)
+    error_marker = to_json(_ERROR_PLACEHOLDER)
+    if body.count(resource_marker) != 1 or body.count(error_marker) != 1:
+        raise ValueError(
+            "Payment requirements must not contain the reserved placeholder "
+            f"values {_RESOURCE_PLACEHOLDER!r} or {_ERROR_PLACEHOLDER!r}"
+        )
+    head, rest = body.split(resource_marker)
+    middle, tail = rest.split(error_marker)
+    return [head, middle, tail]
+
 
 class ResponseWrapper:
-    """Wrapper to capture response status and headers for settlement logic."""
+    """Wrapper to capture response status and headers for settlement logic.
+
+    The real `start_response` is deferred until `finish`, so headers can still
+    be added after the app has produced its response. Anything the app writes
+    through the legacy `write` callable is buffered until then.
+    """
 
     def __init__(self, start_response):
         self.start_response = start_response
+        self.status = None
         self.status_code = None
         self.headers = []
-        self.body = []
+        self.exc_info = None
+        self._written = []
+        self._finished = False
 
     def __call__(self, status, headers, exc_info=None):
+        if self._finished:
+            # The app only started its response while being iterated
+            return self.start_response(status, headers, exc_info)
+        self.status = status
         self.status_code = int(status.split()[0])
         self.headers = headers
-        return self.start_response(status, headers, exc_info)
+        self.exc_info = exc_info
+        return self._written.append
 
     def add_header(self, name, value):
         """Add a header to the response."""
         self.headers.append((name, value))
 
+    def finish(self, app_iter):
+        """Send the captured status and headers, and return the response body."""
+        self._finished = True
+        if self.status is None:
+            return app_iter
+        self.start_response(self.status, self.headers, self.exc_info)
+        if not self._written:
+            return app_iter
+        return ClosingIterator(
+            itertools.chain(self._written, app_iter), getattr(app_iter, "close", None)
+        )
+
 
 class PaymentMiddleware:
     """
@@ -53,7 +128,34 @@ class PaymentMiddleware:
 
     def __init__(self, app: Flask):
         self.app = app
-        self.middleware_configs = []
+        self.middleware_configs: list[Dict[str, Any]] = []
+        # (path, WSGI handler) per configuration, and the app they wrap
+        self._handlers: list[tuple[Union[str, list[str]], Callable]] = []
+        self._next_app: Optional[Callable] = None
+        self._find_handler: Callable[[str], Optional[Callable]] = lambda path: None
+        # Facilitator calls run on one background event loop shared by all
+        # requests, so pooled facilitator connections survive between calls
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    def _run_async(self, coro):
+        """Run a coroutine on the background event loop and wait for its result."""
+        loop = self._loop
+        if loop is None:
+            # Started lazily so that servers forking workers after import
+            # (e.g. gunicorn --preload) start one loop per worker
+            with self._loop_lock:
+                if self._loop is None:
+                    new_loop = asyncio.new_event_loop()
+                    threading.Thread(
+                        target=new_loop.run_forever,
+                        name="x402-facilitator",
+                        daemon=True,
+                    ).start()
+                    atexit.register(new_loop.call_soon_threadsafe, new_loop.stop)
+                    self._loop = new_loop
+                loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
 
     def add(
         self,
@@ -69,6 +171,7 @@ class PaymentMiddleware:
         resource: Optional[str] = None,
         paywall_config: Optional[PaywallConfig] = None,
         custom_paywall_html: Optional[str] = None,
+        exclude: Optional[list[str]] = None,
     ):
         """
         Add a payment middleware configuration.
@@ -86,6 +189,7 @@ class PaymentMiddleware:
             resource (str, optional): Resource URL
             paywall_config (PaywallConfig, optional): Paywall UI customization config
             custom_paywall_html (str, optional): Custom HTML to display for paywall instead of default
+            exclude (list[str], optional): Exact paths matched by `path` that this configuration should not charge for
         """
         config = {
             "price": price,
@@ -100,6 +204,7 @@ class PaymentMiddleware:
             "resource": resource,
             "paywall_config": paywall_config,
             "custom_paywall_html": custom_paywall_html,
+            "exclude": exclude,
         }
         self.middleware_configs.append(config)
 
@@ -108,14 +213,73 @@ class PaymentMiddleware:
 
     def _apply_middleware(self):
         """Apply all middleware configurations to the Flask app."""
-        # Create the middleware chain
-        current_wsgi_app = self.app.wsgi_app
+        # A single dispatching middleware wraps the app, however many
+        # configurations are added
+        if self._next_app is None:
+            self._next_app = self.app.wsgi_app
+            self.app.wsgi_app = self._dispatch
+
+        for config in self.middleware_configs[len(self._handlers) :]:
+            self._handlers.append(
+                (config["path"], self._create_middleware(config, self._next_app))
+            )
 
-        for config in self.middleware_configs:
-            middleware = self._create_middleware(config, current_wsgi_app)
-            current_wsgi_app = middleware
+        # The most recently added configuration takes precedence when several
+        # match, as the outermost middleware of the former chain did
+        routes = self._handlers[::-1]
+        configs = self.middleware_configs[::-1]
+        find_handler = compile_path_dispatcher(routes)
+
+        # Excluded paths are exact, so resolve each once against only the
+        # configurations that don't exclude it; the lookup then falls through
+        # to the next matching configuration instead of skipping payment
+        excluded_handlers = {}
+        for excluded_path in {p for c in configs for p in c["exclude"] or ()}:
+            excluded_handlers[excluded_path] = compile_path_dispatcher(
+                [
+                    route
+                    for route, config in zip(routes, configs)
+                    if excluded_path not in (config["exclude"] or ())
+                ]
+            )(excluded_path)
 
-        self.app.wsgi_app = current_wsgi_app
+        if excluded_handlers:
+            self._find_handler = lambda path: (
+                excluded_handlers[path]
+                if path in excluded_handlers
+                else find_handler(path)
+            )
+        else:
+            self._find_handler = find_handler
+
+    def _dispatch(self, environ, start_response):
+        """Route a request to the payment middleware of its matching configuration."""
+        # CORS preflights carry no payment. Flask answers OPTIONS itself for
+        # rules with automatic options, so those skip payment; views that
+        # handle OPTIONS themselves still need payment. HEAD runs the GET
+        # view, so it needs payment like any other request.
+        if environ.get("REQUEST_METHOD") == "OPTIONS" and self._has_automatic_options(
+            environ
+        ):
+            return self._next_app(environ, start_response)
+
+        # Same normalization as `flask.request.path`
+        handler = self._find_handler("/" + get_path_info(environ).lstrip("/"))
+        if handler is None:
+            return self._next_app(environ, start_response)
+        return handler(environ, start_response)
+
+    def _has_automatic_options(self, environ) -> bool:
+        """Check whether Flask answers an OPTIONS request without running a view."""
+        adapter = self.app.create_url_adapter(self.app.request_class(environ))
+        if adapter is None:
+            return False
+        try:
+            rule, _ = adapter.match(return_rule=True)
+        except HTTPException:
+            return False
+        # Set on the rule by `Flask.add_url_rule`
+        return bool(getattr(rule, "provide_automatic_options", False))
 
     def _create_middleware(self, config: Dict[str, Any], next_app):
         """Create a WSGI middleware function for the given configuration."""
@@ -135,151 +299,198 @@ class PaymentMiddleware:
         except Exception as e:
             raise ValueError(f"Invalid price: {config['price']}. Error: {e}")
 
+        # Only ever used from the background event loop (see `_run_async`)
         facilitator = FacilitatorClient(config["facilitator_config"])
 
-        def middleware(environ, start_response):
-            # Create Flask request context
-            with self.app.request_context(environ):
-                # Skip if the path is not the same as the path in the middleware
-                if not path_is_match(config["path"], request.path):
-                    return next_app(environ, start_response)
-
-                # Get resource URL if not explicitly provided
-                resource_url = config["resource"] or request.url
-
-                # Ensure output_schema and extra are objects, not null
-                output_schema_obj = (
-                    {} if config["output_schema"] is None else config["output_schema"]
-                )
-
-                # Construct payment details
-                payment_requirements = [
-                    PaymentRequirements(
-                        scheme="exact",
-                        network=cast(SupportedNetworks, config["network"]),
-                        asset=asset_address,
-                        max_amount_required=max_amount_required,
-                        resource=resource_url,
-                        description=config["description"],
-                        mime_type=config["mime_type"],
-                        pay_to=config["pay_to_address"],
-                        max_timeout_seconds=config["max_deadline_seconds"],
-                        output_schema=output_schema_obj,
-                        extra=eip712_domain,
-                    )
-                ]
-
-                def x402_response(error: str):
-                    """Create a 402 response with payment requirements."""
-                    request_headers = dict(request.headers)
-                    status = "402 Payment Required"
+        # Ensure output_schema and extra are objects, not null
+        output_schema_obj = (
+            {} if config["output_schema"] is None else config["output_schema"]
+        )
+
+        # Construct payment details once; only the resource can vary per request
+        base_payment_requirements = PaymentRequirements(
+            scheme="exact",
+            network=cast(SupportedNetworks, config["network"]),
+            asset=asset_address,
+            max_amount_required=max_amount_required,
+            resource=config["resource"] or "",
+            description=config["description"],
+            mime_type=config["mime_type"],
+            pay_to=config["pay_to_address"],
+            max_timeout_seconds=config["max_deadline_seconds"],
+            output_schema=output_schema_obj,
+            extra=eip712_domain,
+        )
+
+        # Offered requirements by (scheme, network), so a payment is matched
+        # with one lookup however many are offered
+        requirements_index = {
+            (
+                base_payment_requirements.scheme,
+                base_payment_requirements.network,
+            ): base_payment_requirements
+        }
 
-                    if is_browser_request(request_headers):
-                        html_content = config[
-                            "custom_paywall_html"
-                        ] or get_paywall_html(
-                            error, payment_requirements, config["paywall_config"]
+        # Serialize once for the facilitator, which omits unset (None) values
+        base_facilitator_requirements_dict = base_payment_requirements.model_dump(
+            by_alias=True, exclude_none=True
+        )
+
+        # The 402 body and paywall list every field; only the resource and
+        # error vary
+        base_requirements_dict = base_payment_requirements.model_dump(by_alias=True)
+        body_head, body_middle, body_tail = _encode_402_body_template(
+            base_requirements_dict
+        )
+
+        # A custom paywall is the same for every request, so encode it once
+        custom_paywall_body = (
+            config["custom_paywall_html"].encode("utf-8")
+            if config["custom_paywall_html"]
+            else None
+        )
+
+        # Per-request lookups, bound once as closure variables
+        configured_resource = config["resource"]
+        paywall_config = config["paywall_config"]
+        run_async = self._run_async
+        app_context = self.app.app_context
+        request_class = self.app.request_class
+
+        # Only called for requests whose path matches (see `_dispatch`)
+        def middleware(environ, start_response):
+            # Payment checks read headers straight from the WSGI environ, so no
+            # Flask request context is pushed for requests that end in a 402.
+            # Use the request URL as the resource if not explicitly provided
+            if configured_resource:
+                resource_url = configured_resource
+                facilitator_requirements_dict = base_facilitator_requirements_dict
+            else:
+                # Same URL as `flask.request.url`, without the routing work of a
+                # request context
+                resource_url = request_class(environ).url
+                facilitator_requirements_dict = {
+                    **base_facilitator_requirements_dict,
+                    "resource": resource_url,
+                }
+
+            def x402_response(error: str):
+                """Create a 402 response with payment requirements."""
+                if is_browser_request(
+                    {
+                        "Accept": environ.get("HTTP_ACCEPT", ""),
+                        "User-Agent": environ.get("HTTP_USER_AGENT", ""),
+                    }
+                ):
+                    body = custom_paywall_body or get_paywall_html(
+                        error,
+                        [
+                            base_requirements_dict
+                            if configured_resource
+                            else {**base_requirements_dict, "resource": resource_url}
+                        ],
+                        paywall_config,
+                    ).encode("utf-8")
+                    headers = [_CONTENT_TYPE_HTML, ("Content-Length", str(len(body)))]
+
+                    start_response(_STATUS_402, headers)
+                    return [body]
+                else:
+                    body = b"".join(
+                        (
+                            body_head,
+                            to_json(resource_url),
+                            body_middle,
+                            to_json(error),
+                            body_tail,
                         )
-                        headers = [("Content-Type", "text/html; charset=utf-8")]
-
-                        start_response(status, headers)
-                        return [html_content.encode("utf-8")]
-                    else:
-                        response_data = x402PaymentRequiredResponse(
-                            x402_version=x402_VERSION,
-                            accepts=payment_requirements,
-                            error=error,
-                        ).model_dump(by_alias=True)
+                    )
 
-                        headers = [
-                            ("Content-Type", "application/json"),
-                            ("Content-Length", str(len(json.dumps(response_data)))),
-                        ]
+                    headers = [_CONTENT_TYPE_JSON, ("Content-Length", str(len(body)))]
 
-                        start_response(status, headers)
-                        return [json.dumps(response_data).encode("utf-8")]
+                    start_response(_STATUS_402, headers)
+                    return [body]
 
-                # Check for payment header
-                payment_header = request.headers.get("X-PAYMENT", "")
+            # Check for payment header
+            payment_header = environ.get(_X_PAYMENT, "")
 
-                if payment_header == "":
-                    return x402_response("No X-PAYMENT header provided")
+            if payment_header == "":
+                return x402_response("No X-PAYMENT header provided")
 
-                # Decode payment header
-                try:
-                    payment_dict = json.loads(safe_base64_decode(payment_header))
-                    payment = PaymentPayload(**payment_dict)
-                except Exception as e:
-                    return x402_response(f"Invalid payment header format: {str(e)}")
+            # Decode payment header
+            try:
+                payment = decode_payment_header(payment_header)
+            except Exception as e:
+                return x402_response(f"Invalid payment header format: {str(e)}")
 
-                # Find matching payment requirements
-                selected_payment_requirements = find_matching_payment_requirements(
-                    payment_requirements, payment
-                )
-
-                if not selected_payment_requirements:
-                    return x402_response("No matching payment requirements found")
+            # Find matching payment requirements
+            matched = requirements_index.get((payment.scheme, payment.network))
+            if matched is None:
+                return x402_response("No matching payment requirements found")
+            selected_payment_requirements = (
+                matched
+                if configured_resource
+                else matched.model_copy(update={"resource": resource_url})
+            )
 
-                # Verify payment (async call in sync context)
-                import asyncio
+            # Verify payment (async call in sync context)
+            verify_response = run_async(
+                facilitator.verify(payment, facilitator_requirements_dict)
+            )
 
-                try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    verify_response = loop.run_until_complete(
-                        facilitator.verify(payment, selected_payment_requirements)
-                    )
-                finally:
-                    loop.close()
+            if not verify_response.is_valid:
+                error_reason = verify_response.invalid_reason or "Unknown error"
+                return x402_response(f"Invalid payment: {error_reason}")
 
-                if not verify_response.is_valid:
-                    error_reason = verify_response.invalid_reason or "Unknown error"
-                    return x402_response(f"Invalid payment: {error_reason}")
+            # Create response wrapper to capture status and headers
+            response_wrapper = ResponseWrapper(start_response)
 
-                # Store payment details in Flask g object
+            # Process the request inside an app context holding the payment
+            # details in Flask's g object; Flask reuses it for the request
+            with app_context():
                 g.payment_details = selected_payment_requirements
                 g.verify_response = verify_response
-
-                # Create response wrapper to capture status and headers
-                response_wrapper = ResponseWrapper(start_response)
-
-                # Process the request
                 response = next_app(environ, response_wrapper)
 
-                # Check if response is successful (2xx status code)
-                if (
-                    response_wrapper.status_code is not None
-                    and response_wrapper.status_code >= 200
-                    and response_wrapper.status_code < 300
-                ):
-                    # Settle the payment for successful responses
-                    try:
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        settle_response = loop.run_until_complete(
-                            facilitator.settle(payment, selected_payment_requirements)
+            # Settle the payment only once the app has finished with a
+            # successful (2xx) final status
+            if (
+                response_wrapper.status_code is not None
+                and 200 <= response_wrapper.status_code < 300
+            ):
+                try:
+                    settle_response = run_async(
+                        facilitator.settle(payment, facilitator_requirements_dict)
+                    )
+                except Exception:
+                    logger.exception("Settle failed")
+                    settle_error = "Settle failed"
+                else:
+                    if settle_response.success:
+                        # Add settlement response header
+                        settlement_header = safe_base64_encode(
+                            _settle_response_adapter.dump_json(
+                                settle_response, by_alias=True
+                            )
                         )
+                        response_wrapper.add_header(
+                            _X_PAYMENT_RESPONSE, settlement_header
+                        )
+                        settle_error = None
+                    else:
+                        settle_error = "Settle failed: " + (
+                            settle_response.error_reason or "Unknown error"
+                        )
+                        logger.warning(settle_error)
 
-                        if settle_response.success:
-                            # Add settlement response header
-                            settlement_header = base64.b64encode(
-                                settle_response.model_dump_json(by_alias=True).encode(
-                                    "utf-8"
-                                )
-                            ).decode("utf-8")
-                            response_wrapper.add_header(
-                                "X-PAYMENT-RESPONSE", settlement_header
-                            )
-                        else:
-                            # If settlement fails, we can't return a new response since headers are already sent
-                            # Just log the error and continue with the original response
-                            print(f"Settle failed: {settle_response.error_reason}")
-                    except Exception as e:
-                        # Log the error but don't try to return a new response
-                        print(f"Settle failed: {str(e)}")
-                    finally:
-                        loop.close()
-
-                return response
+                if settle_error is not None:
+                    # Nothing has been sent yet, so the paid response can still
+                    # be replaced; release it before answering with a 402
+                    if hasattr(response, "close"):
+                        response.close()
+                    return x402_response(settle_error)
+
+            # Only now send the status and headers, including the settlement
+            return response_wrapper.finish(response)
 
         return middleware
@@ -1,6 +1,185 @@
 import fnmatch
 import re
-from typing import Union
+from functools import lru_cache
+from typing import Any, Callable, Optional, TypeVar, Union
+
+T = TypeVar("T")
+
+
+def _classify_pattern(pattern: str) -> tuple[str, Any]:
+    """
+    Classify a path pattern by the cheapest way to match it.
+
+    Returns one of:
+    - ("exact", path) for literal paths
+    - ("prefix", prefix) for globs whose only wildcard is a trailing "*"
+    - ("glob", source) for other globs, with the translated regex source
+    - ("regex", match) for 'regex:' patterns, with a compiled match function
+    """
+    # Regex pattern
+    if pattern.startswith("regex:"):
+        return "regex", re.compile(pattern[6:]).match  # Remove 'regex:' prefix
+
+    # Glob pattern (contains * or ?)
+    elif "*" in pattern or "?" in pattern:
+        head = pattern[:-1]
+        if pattern.endswith("*") and not any(c in head for c in "*?["):
+            return "prefix", head
+        return "glob", fnmatch.translate(pattern)
+
+    # Exact match
+    else:
+        return "exact", pattern
+
+
+def _iter_patterns(path: Union[str, list[str]]) -> list[str]:
+    if isinstance(path, str):
+        return [path]
+    elif isinstance(path, list):
+        return path
+    return []
+
+
+def _combine_globs(sources: list[str]) -> list[Callable[[str], Any]]:
+    """Compile translated globs into as few match functions as possible.
+
+    Globs are joined into a single alternation so one regex pass covers all of
+    them, falling back to one regex per glob if the combination doesn't compile.
+    """
+    if not sources:
+        return []
+    try:
+        return [re.compile("|".join(f"(?:{source})" for source in sources)).match]
+    except re.error:
+        return [re.compile(source).match for source in sources]
+
+
+def compile_path_matcher(path: Union[str, list[str]]) -> Callable[[str], bool]:
+    """
+    Compile path pattern(s) into a reusable matcher.
+
+    Patterns are parsed and compiled once, so the returned function can be
+    called on every request without re-translating globs or regexes. Literal
+    paths are checked with a set lookup and trailing-wildcard globs such as
+    "/api/*" with a prefix check before any regex runs. Supports the same
+    patterns as `path_is_match`.
+
+    Args:
+        path: Path pattern(s) to match against. Can be a string or list of strings.
+
+    Returns:
+        Callable[[str], bool]: Function that returns True if a request path matches
+        any of the patterns, False otherwise.
+    """
+    exact: set[str] = set()
+    prefixes: list[str] = []
+    globs: list[str] = []
+    regex_matchers: list[Callable[[str], Any]] = []
+    for pattern in _iter_patterns(path):
+        kind, value = _classify_pattern(pattern)
+        if kind == "exact":
+            exact.add(value)
+        elif kind == "prefix":
+            prefixes.append(value)
+        elif kind == "glob":
+            globs.append(value)
+        else:
+            regex_matchers.append(value)
+
+    exact_paths = frozenset(exact)
+    prefix_tuple = tuple(prefixes)
+    matchers = _combine_globs(globs) + regex_matchers
+
+    def matcher(request_path: str) -> bool:
+        if request_path in exact_paths or request_path.startswith(prefix_tuple):
+            return True
+        for match in matchers:
+            if match(request_path):
+                return True
+        return False
+
+    return matcher
+
+
+def compile_path_dispatcher(
+    routes: list[tuple[Union[str, list[str]], T]],
+) -> Callable[[str], Optional[T]]:
+    """
+    Compile (path pattern(s), value) routes into a single lookup.
+
+    Instead of matching every route's patterns in turn, literal paths of all
+    routes share one dict, trailing-wildcard prefixes one prefix check and globs
+    one combined regex. When several routes match, the earliest one wins.
+    Supports the same patterns as `path_is_match`.
+
+    Args:
+        routes: (path, value) pairs in order of precedence, where path is a
+            pattern or list of patterns.
+
+    Returns:
+        Callable[[str], Optional[T]]: Function that returns the value of the first
+        route matching a request path, or None if no route matches.
+    """
+    exact: dict[str, int] = {}
+    prefixes: list[tuple[str, int]] = []
+    globs: list[tuple[str, int]] = []
+    regex_matchers: list[tuple[Callable[[str], Any], int]] = []
+    for index, (path, _) in enumerate(routes):
+        for pattern in _iter_patterns(path):
+            kind, value = _classify_pattern(pattern)
+            if kind == "exact":
+                exact.setdefault(value, index)
+            elif kind == "prefix":
+                prefixes.append((value, index))
+            elif kind == "glob":
+                globs.append((value, index))
+            else:
+                regex_matchers.append((value, index))
+
+    values = [value for _, value in routes]
+    prefix_tuple = tuple(prefix for prefix, _ in prefixes)
+
+    # One alternation over every glob, ordered by precedence; the name of the
+    # group that matched identifies the route
+    glob_routes: dict[Optional[str], int] = {}
+    combined_glob = None
+    if globs:
+        globs.sort(key=lambda glob: glob[1])
+        try:
+            combined_glob = re.compile(
+                "|".join(f"(?P<r{i}>{source})" for i, (source, _) in enumerate(globs))
+            ).match
+            glob_routes = {f"r{i}": index for i, (_, index) in enumerate(globs)}
+        except re.error:
+            regex_matchers.extend(
+                (re.compile(source).match, index) for source, index in globs
+            )
+    regex_matchers.sort(key=lambda matcher: matcher[1])
+
+    def dispatcher(request_path: str) -> Optional[T]:
+        best = exact.get(request_path, len(routes))
+        if request_path.startswith(prefix_tuple):
+            for prefix, index in prefixes:
+                if index < best and request_path.startswith(prefix):
+                    best = index
+        if combined_glob is not None:
+            match = combined_glob(request_path)
+            if match:
+                best = min(best, glob_routes[match.lastgroup])
+        for match_regex, index in regex_matchers:
+            if index >= best:
+                break
+            if match_regex(request_path):
+                best = index
+                break
+        return values[best] if best < len(routes) else None
+
+    return dispatcher
+
+
+@lru_cache(maxsize=256)
+def _cached_path_matcher(patterns: tuple[str, ...]) -> Callable[[str], bool]:
+    return compile_path_matcher(list(patterns))
 
 
 def path_is_match(path: Union[str, list[str]], request_path: str) -> bool:
@@ -19,25 +198,8 @@ def path_is_match(path: Union[str, list[str]], request_path: str) -> bool:
 
     Returns:
         bool: True if the request path matches any of the patterns, False otherwise.
-    """
-
-    def single_path_match(pattern: str) -> bool:
-        # Regex pattern
-        if pattern.startswith("regex:"):
-            regex_pattern = pattern[6:]  # Remove 'regex:' prefix
-            return bool(re.match(regex_pattern, request_path))
-
-        # Glob pattern (contains * or ?)
-        elif "*" in pattern or "?" in pattern:
-            return fnmatch.fnmatch(request_path, pattern)
 
-        # Exact match
-        else:
-            return pattern == request_path
-
-    if isinstance(path, str):
-        return single_path_match(path)
-    elif isinstance(path, list):
-        return any(single_path_match(p) for p in path)
-
-    return False
+    Compiled patterns are cached, so repeated calls with the same pattern(s) do
+    not re-parse them; use `compile_path_matcher` to hold on to a matcher.
+    """
+    return _cached_path_matcher(tuple(_iter_patterns(path)))(request_path)
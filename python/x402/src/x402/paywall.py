@@ -1,5 +1,5 @@
 import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 
 from x402.types import PaymentRequirements, PaywallConfig
 from x402.common import x402_VERSION
@@ -26,15 +26,31 @@ def is_browser_request(headers: Dict[str, Any]) -> bool:
     return False
 
 
+def _requirements_for_paywall(
+    payment_requirements: Union[PaymentRequirements, Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Serialize payment requirements for the paywall, keeping unset fields"""
+    if isinstance(payment_requirements, dict):
+        return payment_requirements
+    return payment_requirements.model_dump(by_alias=True)
+
+
 def create_x402_config(
     error: str,
-    payment_requirements: List[PaymentRequirements],
+    payment_requirements: List[Union[PaymentRequirements, Dict[str, Any]]],
     paywall_config: Optional[PaywallConfig] = None,
 ) -> Dict[str, Any]:
-    """Create x402 configuration object from payment requirements."""
+    """Create x402 configuration object from payment requirements.
+
+    Requirements may also be passed pre-serialized (by alias), which lets
+    callers reuse one dump across requests.
+    """
 
-    requirements = payment_requirements[0] if payment_requirements else None
-    display_amount = 0
+    requirements_dicts = [
+        _requirements_for_paywall(req) for req in payment_requirements
+    ]
+    requirements = requirements_dicts[0] if requirements_dicts else None
+    display_amount: float = 0
     current_url = ""
     testnet = True
 
@@ -42,13 +58,13 @@ def create_x402_config(
         # Convert atomic amount back to USD (assuming USDC with 6 decimals)
         try:
             display_amount = (
-                float(requirements.max_amount_required) / 1000000
+                float(requirements["maxAmountRequired"]) / 1000000
             )  # USDC has 6 decimals
         except (ValueError, TypeError):
             display_amount = 0
 
-        current_url = requirements.resource or ""
-        testnet = requirements.network == "base-sepolia"
+        current_url = requirements["resource"] or ""
+        testnet = requirements["network"] == "base-sepolia"
 
     # Get paywall config values or defaults
     config = paywall_config or {}
@@ -56,9 +72,7 @@ def create_x402_config(
     # Create the window.x402 configuration object
     return {
         "amount": display_amount,
-        "paymentRequirements": [
-            req.model_dump(by_alias=True) for req in payment_requirements
-        ],
+        "paymentRequirements": requirements_dicts,
         "testnet": testnet,
         "currentUrl": current_url,
         "error": error,
@@ -73,7 +87,7 @@ def create_x402_config(
 def inject_payment_data(
     html_content: str,
     error: str,
-    payment_requirements: List[PaymentRequirements],
+    payment_requirements: List[Union[PaymentRequirements, Dict[str, Any]]],
     paywall_config: Optional[PaywallConfig] = None,
 ) -> str:
     """Inject payment requirements into HTML as JavaScript variables."""
@@ -100,7 +114,7 @@ def inject_payment_data(
 
 def get_paywall_html(
     error: str,
-    payment_requirements: List[PaymentRequirements],
+    payment_requirements: List[Union[PaymentRequirements, Dict[str, Any]]],
     paywall_config: Optional[PaywallConfig] = None,
 ) -> str:
     """
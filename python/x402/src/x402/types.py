@@ -11,6 +11,17 @@ from pydantic.alias_generators import to_camel
 from x402.networks import SupportedNetworks
 
 
+def _is_integer_string(v: str) -> bool:
+    """Whether `int(v)` would accept the string, checking plain digits first."""
+    if v.isdecimal():
+        return True
+    try:
+        int(v)
+    except ValueError:
+        return False
+    return True
+
+
 class TokenAmount(BaseModel):
     """Represents an amount of tokens in atomic units with asset information"""
 
@@ -19,9 +30,7 @@ class TokenAmount(BaseModel):
 
     @field_validator("amount")
     def validate_amount(cls, v):
-        try:
-            int(v)
-        except ValueError:
+        if not _is_integer_string(v):
             raise ValueError("amount must be an integer encoded as a string")
         return v
 
@@ -73,9 +82,7 @@ class PaymentRequirements(BaseModel):
 
     @field_validator("max_amount_required")
     def validate_max_amount_required(cls, v):
-        try:
-            int(v)
-        except ValueError:
+        if not _is_integer_string(v):
             raise ValueError(
                 "max_amount_required must be an integer encoded as a string"
             )
@@ -116,9 +123,7 @@ class EIP3009Authorization(BaseModel):
 
     @field_validator("value")
     def validate_value(cls, v):
-        try:
-            int(v)
-        except ValueError:
+        if not _is_integer_string(v):
             raise ValueError("value must be an integer encoded as a string")
         return v
 
@@ -166,6 +171,13 @@ class PaymentPayload(BaseModel):
     )
 
 
+# Resolve the forward references of models declared before their field types
+# now, rather than on first validation during a request
+TokenAsset.model_rebuild()
+TokenAmount.model_rebuild()
+ExactPaymentPayload.model_rebuild()
+
+
 class X402Headers(BaseModel):
     x_payment: str
 
@@ -308,3 +308,17 @@ def test_x402_requests(account):
         adapter.client.select_payment_requirements
         != adapter.client.__class__.select_payment_requirements
     )
+
+
+def test_x402_requests_pooling(account):
+    session = x402_requests(account)
+    adapter = session.adapters.get("https://")
+    assert adapter._pool_connections == 10
+    assert adapter._pool_maxsize == 20
+    assert adapter.max_retries.total == 2
+
+    # Explicit adapter arguments take precedence over the defaults
+    session = x402_requests(account, pool_maxsize=5, max_retries=0)
+    adapter = session.adapters.get("https://")
+    assert adapter._pool_maxsize == 5
+    assert adapter.max_retries.total == 0
@@ -0,0 +1,54 @@
+import base64
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from x402.facilitator import FacilitatorClient
+from x402.types import SettleResponse, VerifyResponse
+
+
+def _payment_header(network: str = "base-sepolia") -> str:
+    payment = {
+        "x402Version": 1,
+        "scheme": "exact",
+        "network": network,
+        "payload": {
+            "signature": "0x1234",
+            "authorization": {
+                "from": "0x2222222222222222222222222222222222222222",
+                "to": "0x1111111111111111111111111111111111111111",
+                "value": "1000000",
+                "validAfter": "0",
+                "validBefore": "9999999999",
+                "nonce": "0xabc",
+            },
+        },
+    }
+    return base64.b64encode(json.dumps(payment).encode("utf-8")).decode("utf-8")
+
+
+@pytest.fixture
+def make_payment_header():
+    """Builder for an encoded X-PAYMENT header on the given network."""
+    return _payment_header
+
+
+@pytest.fixture
+def mock_facilitator(monkeypatch):
+    """Patch FacilitatorClient so every payment verifies and settles.
+
+    Returns the `verify` and `settle` mocks so tests can inspect calls or
+    change their results.
+    """
+    verify = AsyncMock(
+        return_value=VerifyResponse(is_valid=True, invalid_reason=None, payer="0x2")
+    )
+    settle = AsyncMock(
+        return_value=SettleResponse(
+            success=True, transaction="0xdead", network="base-sepolia", payer="0x2"
+        )
+    )
+    monkeypatch.setattr(FacilitatorClient, "verify", verify)
+    monkeypatch.setattr(FacilitatorClient, "settle", settle)
+    return SimpleNamespace(verify=verify, settle=settle)
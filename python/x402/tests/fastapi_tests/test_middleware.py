@@ -1,6 +1,7 @@
-from fastapi import FastAPI, Request
+from fastapi import APIRouter, FastAPI, Request
 from fastapi.testclient import TestClient
-from x402.fastapi.middleware import require_payment
+from x402.clients.base import decode_x_payment_response
+from x402.fastapi.middleware import require_payment, require_payment_route
 from x402.types import PaywallConfig
 
 
@@ -86,6 +87,116 @@ def test_middleware_path_list_matching():
     assert response.json() == {"message": "success"}
 
 
+def test_payment_requirements_resource():
+    app = FastAPI()
+    app.get("/test")(test_endpoint)
+    app.get("/other")(test_endpoint)
+    app.middleware("http")(
+        require_payment(
+            price="$1.00",
+            pay_to_address="0x1111111111111111111111111111111111111111",
+            path="/test",
+            network="base-sepolia",
+        )
+    )
+    app.middleware("http")(
+        require_payment(
+            price="$1.00",
+            pay_to_address="0x1111111111111111111111111111111111111111",
+            path="/other",
+            network="base-sepolia",
+            resource="https://example.com/other",
+        )
+    )
+
+    client = TestClient(app)
+
+    # Resource defaults to the request URL
+    for query in ["?a=1", "?a=2"]:
+        response = client.get(f"/test{query}")
+        assert response.status_code == 402
+        accepts = response.json()["accepts"]
+        assert accepts[0]["resource"] == f"http://testserver/test{query}"
+        assert accepts[0]["maxAmountRequired"] == "1000000"
+        assert accepts[0]["outputSchema"] == {}
+
+    # Explicit resource is used as-is
+    response = client.get("/other?a=1")
+    assert response.status_code == 402
+    assert response.json()["accepts"][0]["resource"] == "https://example.com/other"
+
+
+def create_paid_app():
+    app = FastAPI()
+    app.get("/test")(test_endpoint)
+    payment_middleware = require_payment(
+        price="$1.00",
+        pay_to_address="0x1111111111111111111111111111111111111111",
+        path="/test",
+        network="base-sepolia",
+    )
+    app.middleware("http")(payment_middleware)
+    return app
+
+
+def test_valid_payment_is_settled(mock_facilitator, make_payment_header):
+    client = TestClient(create_paid_app())
+
+    response = client.get("/test", headers={"X-PAYMENT": make_payment_header()})
+    assert response.status_code == 200
+    assert response.json() == {"message": "success"}
+
+    payment_response = decode_x_payment_response(response.headers["X-PAYMENT-RESPONSE"])
+    assert payment_response["success"] is True
+    assert payment_response["transaction"] == "0xdead"
+    assert payment_response["network"] == "base-sepolia"
+
+    payment, requirements = mock_facilitator.verify.call_args.args
+    assert payment.network == "base-sepolia"
+    assert requirements["resource"] == "http://testserver/test"
+    assert requirements["maxAmountRequired"] == "1000000"
+    assert mock_facilitator.settle.call_args.args[1] == requirements
+
+
+def test_payment_for_other_network_is_rejected(mock_facilitator, make_payment_header):
+    client = TestClient(create_paid_app())
+
+    response = client.get("/test", headers={"X-PAYMENT": make_payment_header("base")})
+    assert response.status_code == 402
+    assert response.json()["error"] == "No matching payment requirements found"
+    mock_facilitator.verify.assert_not_called()
+
+
+def test_payment_route_class(mock_facilitator, make_payment_header):
+    route_class = require_payment_route(
+        price="$1.00",
+        pay_to_address="0x1111111111111111111111111111111111111111",
+        network="base-sepolia",
+    )
+
+    app = FastAPI()
+    app.get("/free")(test_endpoint)
+    router = APIRouter(route_class=route_class)
+    router.get("/paid")(test_endpoint)
+    app.include_router(router)
+
+    client = TestClient(app)
+
+    # Routes outside the router are never gated
+    response = client.get("/free")
+    assert response.status_code == 200
+
+    response = client.get("/paid")
+    assert response.status_code == 402
+    assert response.json()["accepts"][0]["resource"] == "http://testserver/paid"
+
+    response = client.get("/paid", headers={"X-PAYMENT": make_payment_header()})
+    assert response.status_code == 200
+    assert response.json() == {"message": "success"}
+    assert decode_x_payment_response(response.headers["X-PAYMENT-RESPONSE"])["success"]
+    mock_facilitator.settle.assert_called_once()
+
+
 def expected_path(given: str, expected: str) -> bool:
     app = FastAPI()
 
@@ -101,7 +212,7 @@ def expected_path(given: str, expected: str) -> bool:
 
 
 def test_path_matching():
-    from x402.path import path_is_match
+    from x402.path import compile_path_matcher, path_is_match
 
     # Test paths are parsed correctly
     assert expected_path("/", "/")
@@ -141,6 +252,28 @@ def test_path_matching():
     assert path_is_match(["/exact", "/api/*", "regex:^/users/\\d+$"], "/users/123")
     assert not path_is_match(["/exact", "/api/*", "regex:^/users/\\d+$"], "/other")
 
+    # Test compiled matchers behave the same as path_is_match
+    matcher = compile_path_matcher(["/exact", "/api/*", "regex:^/users/\\d+$"])
+    assert matcher("/exact")
+    assert matcher("/api/posts")
+    assert matcher("/users/123")
+    assert not matcher("/other")
+    assert not matcher("/users/abc")
+    assert compile_path_matcher("/api/*/profile")("/api/user/profile")
+    assert not compile_path_matcher("/api/*/profile")("/api/user/settings")
+
+    # Test trailing wildcard globs (matched by prefix)
+    assert compile_path_matcher("*")("/anything/at/all")
+    assert compile_path_matcher("*")("")
+    assert compile_path_matcher("/api*")("/apiv2/users")
+    assert compile_path_matcher("/api/*")("/api/")
+    assert compile_path_matcher("/api/*")("/api/a/b\nc")
+    assert not compile_path_matcher("/api/*")("/api")
+    assert compile_path_matcher("/v[12]/*")("/v1/users")
+    assert not compile_path_matcher("/v[12]/*")("/v3/users")
+    assert compile_path_matcher("/api/?/*")("/api/x/users")
+    assert not compile_path_matcher("/api/?/*")("/api/xy/users")
+
 
 def test_abusive_url_paths():
     """Test various abusive and edge-case URL paths that could bypass security"""
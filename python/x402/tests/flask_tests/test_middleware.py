@@ -1,5 +1,19 @@
+import asyncio
+import base64
+import json
+import threading
+
+import pytest
 from flask import Flask, g
-from x402.flask.middleware import PaymentMiddleware
+from pydantic_core import to_json
+from x402.facilitator import FacilitatorClient
+from x402.flask.middleware import PaymentMiddleware, ResponseWrapper
+from x402.types import (
+    PaymentRequirements,
+    SettleResponse,
+    VerifyResponse,
+    x402PaymentRequiredResponse,
+)
 
 
 def create_app_with_middleware(configs):
@@ -103,6 +117,91 @@ def test_path_pattern_matching():
         assert client.get("/baz/abc").status_code == 200
 
 
+def test_preflight_requests_skip_payment():
+    app = create_app_with_middleware(
+        [
+            {
+                "price": "$1.00",
+                "pay_to_address": "0x1",
+                "path": "/protected",
+                "network": "base-sepolia",
+            }
+        ]
+    )
+    with app.test_client() as client:
+        assert client.options("/protected").status_code == 200
+        # HEAD runs the GET view, so it is not free
+        assert client.head("/protected").status_code == 402
+        assert client.get("/protected").status_code == 402
+
+
+def test_options_handled_by_view_requires_payment():
+    app = Flask(__name__)
+
+    @app.route("/paid", methods=["GET", "OPTIONS"])
+    def paid():
+        return "paid content"
+
+    middleware = PaymentMiddleware(app)
+    middleware.add(
+        price="$1.00", pay_to_address="0x1", path="/paid", network="base-sepolia"
+    )
+    with app.test_client() as client:
+        response = client.options("/paid")
+        assert response.status_code == 402
+        assert b"paid content" not in response.data
+
+
+def test_excluded_paths_skip_payment():
+    app = create_app_with_middleware(
+        [
+            {
+                "price": "$1.00",
+                "pay_to_address": "0x1",
+                "path": "*",
+                "network": "base-sepolia",
+                "exclude": ["/unprotected"],
+            }
+        ]
+    )
+    with app.test_client() as client:
+        resp = client.get("/unprotected")
+        assert resp.status_code == 200
+        assert resp.json == {"message": "unprotected"}
+
+        resp = client.get("/protected")
+        assert resp.status_code == 402
+
+
+def test_excluded_path_falls_through_to_other_configs():
+    app = create_app_with_middleware(
+        [
+            {
+                "price": "$5.00",
+                "pay_to_address": "0x1",
+                "path": "/protected",
+                "network": "base-sepolia",
+            },
+            {
+                "price": "$1.00",
+                "pay_to_address": "0x1",
+                "path": "*",
+                "network": "base-sepolia",
+                "exclude": ["/protected", "/unprotected"],
+            },
+        ]
+    )
+    with app.test_client() as client:
+        # Still charged by the first configuration, at its price
+        resp = client.get("/protected")
+        assert resp.status_code == 402
+        assert resp.json["accepts"][0]["maxAmountRequired"] == "5000000"
+
+        # Not matched by any other configuration
+        resp = client.get("/unprotected")
+        assert resp.status_code == 200
+
+
 def test_multiple_middleware_configs():
     app = Flask(__name__)
 
@@ -288,6 +387,7 @@ def test_custom_paywall_html():
         assert "Custom Payment Required" in html_content
         assert "custom-payment" in html_content
         assert "Custom Paywall" in html_content
+        assert resp.headers["Content-Length"] == str(len(resp.get_data()))
 
 
 def test_mainnet_vs_testnet_config():
@@ -358,3 +458,301 @@ def test_payment_amount_conversion():
         html_content = resp.get_data(as_text=True)
         # $0.001 should be converted to 0.001 in the display
         assert '"amount": 0.001' in html_content
+
+
+def test_valid_payment_is_verified_and_settled(mock_facilitator, make_payment_header):
+
+    app = create_app_with_middleware(
+        [
+            {
+                "price": "$1.00",
+                "pay_to_address": "0x1111111111111111111111111111111111111111",
+                "path": "/protected",
+                "network": "base-sepolia",
+            }
+        ]
+    )
+    with app.test_client() as client:
+        resp = client.get(
+            "/protected?a=1", headers={"X-PAYMENT": make_payment_header()}
+        )
+        assert resp.status_code == 200
+        assert resp.json == {"message": "protected"}
+        settlement = json.loads(base64.b64decode(resp.headers["X-PAYMENT-RESPONSE"]))
+        assert settlement["transaction"] == "0xdead"
+
+        # Settlement only happens for successful responses
+        resp = client.get("/missing", headers={"X-PAYMENT": make_payment_header()})
+        assert resp.status_code == 404
+
+    payment, requirements = mock_facilitator.verify.call_args_list[0].args
+    assert payment.network == "base-sepolia"
+    assert requirements["resource"] == "http://localhost/protected?a=1"
+    assert requirements["maxAmountRequired"] == "1000000"
+    assert mock_facilitator.settle.call_count == 1
+    assert mock_facilitator.settle.call_args.args[1] == requirements
+
+
+def test_settlement_header_sent_with_response_headers(
+    mock_facilitator, make_payment_header
+):
+
+    app = create_app_with_middleware(
+        [
+            {
+                "price": "$1.00",
+                "pay_to_address": "0x1111111111111111111111111111111111111111",
+                "path": "/protected",
+                "network": "base-sepolia",
+            }
+        ]
+    )
+
+    # A server sends the headers as soon as start_response is called, so copy
+    # them at that point rather than looking at the list afterwards
+    sent = []
+
+    def start_response(status, headers, exc_info=None):
+        sent.append((status, list(headers)))
+        return lambda data: None
+
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": "/protected",
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "wsgi.url_scheme": "http",
+        "HTTP_X_PAYMENT": make_payment_header(),
+    }
+    body = b"".join(app.wsgi_app(environ, start_response))
+
+    assert json.loads(body) == {"message": "protected"}
+    [(status, headers)] = sent
+    assert status == "200 OK"
+    assert "X-PAYMENT-RESPONSE" in dict(headers)
+
+
+def test_failed_settlement_returns_402(mock_facilitator, make_payment_header):
+    mock_facilitator.settle.return_value = SettleResponse(
+        success=False, error_reason="insufficient_funds", network="base-sepolia"
+    )
+
+    app = create_app_with_middleware(
+        [
+            {
+                "price": "$1.00",
+                "pay_to_address": "0x1111111111111111111111111111111111111111",
+                "path": "/protected",
+                "network": "base-sepolia",
+            }
+        ]
+    )
+    with app.test_client() as client:
+        resp = client.get("/protected", headers={"X-PAYMENT": make_payment_header()})
+        assert resp.status_code == 402
+        assert resp.json["error"] == "Settle failed: insufficient_funds"
+        assert "X-PAYMENT-RESPONSE" not in resp.headers
+
+        mock_facilitator.settle.side_effect = RuntimeError("facilitator unavailable")
+        resp = client.get("/protected", headers={"X-PAYMENT": make_payment_header()})
+        assert resp.status_code == 402
+        assert resp.json["error"] == "Settle failed"
+        assert resp.json.get("message") is None
+
+
+def test_failed_request_is_not_settled(mock_facilitator, make_payment_header):
+
+    app = create_app_with_middleware(
+        [
+            {
+                "price": "$1.00",
+                "pay_to_address": "0x1111111111111111111111111111111111111111",
+                "path": "/protected",
+                "network": "base-sepolia",
+            }
+        ]
+    )
+
+    @app.teardown_request
+    def fail_teardown(exc):
+        raise RuntimeError("teardown failed")
+
+    with app.test_client() as client:
+        with pytest.raises(RuntimeError, match="teardown failed"):
+            client.get("/protected", headers={"X-PAYMENT": make_payment_header()})
+
+    assert mock_facilitator.settle.call_count == 0
+
+
+def test_response_wrapper_uses_final_status():
+    sent = []
+    wrapper = ResponseWrapper(
+        lambda status, headers, exc_info=None: sent.append((status, headers))
+    )
+    wrapper("200 OK", [])
+    wrapper("500 INTERNAL SERVER ERROR", [("Content-Type", "text/plain")], None)
+    assert wrapper.status_code == 500
+    # Nothing is sent until the response is finished
+    assert sent == []
+
+    assert list(wrapper.finish([b"error"])) == [b"error"]
+    assert sent == [("500 INTERNAL SERVER ERROR", [("Content-Type", "text/plain")])]
+
+
+def test_payment_for_other_network_is_rejected(mock_facilitator, make_payment_header):
+
+    app = create_app_with_middleware(
+        [
+            {
+                "price": "$1.00",
+                "pay_to_address": "0x1111111111111111111111111111111111111111",
+                "path": "/protected",
+                "network": "base-sepolia",
+            }
+        ]
+    )
+    with app.test_client() as client:
+        resp = client.get(
+            "/protected", headers={"X-PAYMENT": make_payment_header("base")}
+        )
+        assert resp.status_code == 402
+        assert resp.json["error"] == "No matching payment requirements found"
+    mock_facilitator.verify.assert_not_called()
+
+
+def test_402_body_matches_model_dump():
+    app = create_app_with_middleware(
+        [
+            {
+                "price": "$1.00",
+                "pay_to_address": "0x1111111111111111111111111111111111111111",
+                "path": "/protected",
+                "network": "base-sepolia",
+                "description": 'Quotes "and" \\ backslashes',
+            }
+        ]
+    )
+    with app.test_client() as client:
+        resp = client.get("/protected?a=1", headers={"X-PAYMENT": "invalid"})
+
+    assert resp.status_code == 402
+    body = resp.get_data()
+    assert resp.headers["Content-Length"] == str(len(body))
+
+    requirements = PaymentRequirements(**resp.json["accepts"][0])
+    assert requirements.resource == "http://localhost/protected?a=1"
+    expected = x402PaymentRequiredResponse(
+        x402_version=1, accepts=[requirements], error=resp.json["error"]
+    ).model_dump(by_alias=True)
+    assert body == to_json(expected)
+
+
+def test_placeholder_in_config_is_rejected():
+    with pytest.raises(ValueError, match="reserved placeholder"):
+        create_app_with_middleware(
+            [
+                {
+                    "price": "$1.00",
+                    "pay_to_address": "0x1",
+                    "path": "/protected",
+                    "network": "base-sepolia",
+                    "description": "\x00x402-error\x00",
+                }
+            ]
+        )
+
+
+def test_facilitator_calls_share_background_loop(monkeypatch, make_payment_header):
+    loops = []
+
+    async def verify(payment, requirements):
+        loops.append((asyncio.get_running_loop(), threading.current_thread().name))
+        return VerifyResponse(is_valid=True, invalid_reason=None, payer="0x2")
+
+    async def settle(payment, requirements):
+        loops.append((asyncio.get_running_loop(), threading.current_thread().name))
+        return SettleResponse(success=True, network="base-sepolia", payer="0x2")
+
+    monkeypatch.setattr(FacilitatorClient, "verify", staticmethod(verify))
+    monkeypatch.setattr(FacilitatorClient, "settle", staticmethod(settle))
+
+    app = create_app_with_middleware(
+        [
+            {
+                "price": "$1.00",
+                "pay_to_address": "0x1111111111111111111111111111111111111111",
+                "path": "/protected",
+                "network": "base-sepolia",
+            }
+        ]
+    )
+    with app.test_client() as client:
+        for _ in range(2):
+            resp = client.get(
+                "/protected", headers={"X-PAYMENT": make_payment_header()}
+            )
+            assert resp.status_code == 200
+
+    assert len(loops) == 4
+    assert len({id(loop) for loop, _ in loops}) == 1
+    assert {name for _, name in loops} == {"x402-facilitator"}
+
+
+def test_overlapping_configs_use_most_recent(mock_facilitator, make_payment_header):
+
+    app = create_app_with_middleware(
+        [
+            {
+                "price": "$1.00",
+                "pay_to_address": "0x1111111111111111111111111111111111111111",
+                "path": "*",
+                "network": "base-sepolia",
+            },
+            {
+                "price": "$2.00",
+                "pay_to_address": "0x1111111111111111111111111111111111111111",
+                "path": "/protected",
+                "network": "base-sepolia",
+            },
+        ]
+    )
+    with app.test_client() as client:
+        resp = client.get("/unprotected")
+        assert resp.status_code == 402
+        assert resp.json["accepts"][0]["maxAmountRequired"] == "1000000"
+
+        resp = client.get("/protected")
+        assert resp.json["accepts"][0]["maxAmountRequired"] == "2000000"
+
+        # Only one configuration handles a paid request
+        resp = client.get("/protected", headers={"X-PAYMENT": make_payment_header()})
+        assert resp.status_code == 200
+    assert mock_facilitator.verify.call_count == 1
+    assert mock_facilitator.settle.call_count == 1
+
+
+def test_payment_details_in_g_for_paid_request(mock_facilitator, make_payment_header):
+
+    app = Flask(__name__)
+
+    @app.route("/protected")
+    def protected():
+        return {
+            "resource": g.payment_details.resource,
+            "payer": g.verify_response.payer,
+        }
+
+    middleware = PaymentMiddleware(app)
+    middleware.add(
+        price="$1.00",
+        pay_to_address="0x1111111111111111111111111111111111111111",
+        path="/protected",
+        network="base-sepolia",
+    )
+    with app.test_client() as client:
+        resp = client.get("/protected", headers={"X-PAYMENT": make_payment_header()})
+        assert resp.status_code == 200
+        assert resp.json == {
+            "resource": "http://localhost/protected",
+            "payer": "0x2",
+        }
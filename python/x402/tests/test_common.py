@@ -1,9 +1,13 @@
+import pytest
+
 from x402.common import (
+    decode_payment_header,
     parse_money,
     process_price_to_atomic_amount,
     get_usdc_address,
     find_matching_payment_requirements,
 )
+from x402.encoding import safe_base64_encode
 from x402.types import (
     TokenAmount,
     TokenAsset,
@@ -45,6 +49,18 @@ def test_parse_money():
         == 1120000
     )
 
+    # Fractional amounts and precision beyond the token decimals (truncated)
+    usdc = "0x036CbD53842c5426634e7929541eC2318f3dCF7e"
+    assert parse_money("$0.001", usdc, "base-sepolia") == 1000
+    assert parse_money(".5", usdc, "base-sepolia") == 500000
+    assert parse_money("1.", usdc, "base-sepolia") == 1000000
+    assert parse_money("1.1234567", usdc, "base-sepolia") == 1123456
+    assert parse_money("0.0000001", usdc, "base-sepolia") == 0
+
+    # Less common formats fall back to Decimal parsing
+    assert parse_money("1e2", usdc, "base-sepolia") == 100000000
+    assert parse_money(" 1.5 ", usdc, "base-sepolia") == 1500000
+
 
 def test_process_price_to_atomic_amount_money():
     """Test processing USD money strings to atomic amounts"""
@@ -65,6 +81,12 @@ def test_process_price_to_atomic_amount_money():
     amount, address, domain = process_price_to_atomic_amount(2, "base-sepolia")
     assert amount == "2000000"  # 2 USDC = 2,000,000 atomic units
 
+    # Test mainnet token metadata
+    amount, address, domain = process_price_to_atomic_amount("$0.01", "base")
+    assert amount == "10000"
+    assert address == "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"
+    assert domain == {"name": "USD Coin", "version": "2"}
+
 
 def test_process_price_to_atomic_amount_token():
     """Test processing TokenAmount to atomic amounts"""
@@ -106,6 +128,17 @@ def test_get_usdc_address():
     address = get_usdc_address(84532)  # base-sepolia as int
     assert address == "0x036CbD53842c5426634e7929541eC2318f3dCF7e"
 
+    # Test other supported chains
+    assert get_usdc_address(8453) == "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"
+    assert get_usdc_address("43114") == "0xB97EF9Ef8734C71904D8002F8b6Bc66Dd9c48a6E"
+
+    # Test unsupported chain ID
+    try:
+        get_usdc_address(1)
+        assert False, "Should have raised ValueError"
+    except ValueError as e:
+        assert "not found for chain 1" in str(e)
+
 
 def test_find_matching_payment_requirements():
     """Test finding matching payment requirements"""
@@ -173,3 +206,36 @@ def test_find_matching_payment_requirements():
     payment.scheme = "different"  # No matching scheme
     match = find_matching_payment_requirements(requirements, payment)
     assert match is None
+
+
+def test_decode_payment_header():
+    """Test decoding and caching of X-PAYMENT headers"""
+    payment = PaymentPayload(
+        x402_version=1,
+        scheme="exact",
+        network="base-sepolia",
+        payload=ExactPaymentPayload(
+            signature="0x1234",
+            authorization=EIP3009Authorization(
+                **{
+                    "from": "0xabcd1234567890123456789012345678901234abcd",
+                    "to": "0x1234567890123456789012345678901234567890",
+                    "value": "1000000",
+                    "validAfter": "1234567890",
+                    "validBefore": "1234567999",
+                    "nonce": "0xabc123",
+                }
+            ),
+        ),
+    )
+    header = safe_base64_encode(payment.model_dump_json(by_alias=True))
+
+    decoded = decode_payment_header(header)
+    assert decoded == payment
+    # Repeated headers are served from the cache
+    assert decode_payment_header(header) is decoded
+
+    with pytest.raises(ValueError):
+        decode_payment_header("not base64!")
+    with pytest.raises(ValueError):
+        decode_payment_header(safe_base64_encode('{"scheme": "exact"}'))
@@ -1,5 +1,9 @@
 import pytest
-from x402.encoding import safe_base64_encode, safe_base64_decode
+from x402.encoding import (
+    safe_base64_encode,
+    safe_base64_decode,
+    safe_base64_decode_bytes,
+)
 
 
 def test_safe_base64_encode():
@@ -50,6 +54,19 @@ def test_safe_base64_decode():
         safe_base64_decode("//79")  # This is the base64 encoding of \xff\xfe\xfd
 
 
+def test_safe_base64_decode_bytes():
+    assert safe_base64_decode_bytes("aGVsbG8=") == b"hello"
+    assert safe_base64_decode_bytes(b"aGVsbG8=") == b"hello"
+    assert safe_base64_decode_bytes("") == b""
+
+    # Non-utf8 bytes are returned as-is
+    assert safe_base64_decode_bytes("//79") == b"\xff\xfe\xfd"
+
+    # Test base64 with invalid padding
+    with pytest.raises(Exception):
+        safe_base64_decode_bytes("aGVsbG8")
+
+
 def test_encode_decode_roundtrip():
     test_strings = [
         "hello",
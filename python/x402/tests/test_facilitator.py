@@ -0,0 +1,187 @@
+import json
+
+import httpx
+import pytest
+
+from x402.facilitator import FacilitatorClient
+from x402.types import (
+    PaymentRequirements,
+    PaymentPayload,
+    ExactPaymentPayload,
+    EIP3009Authorization,
+)
+
+
+@pytest.fixture
+def payment_requirements():
+    return PaymentRequirements(
+        scheme="exact",
+        network="base-sepolia",
+        asset="0x036CbD53842c5426634e7929541eC2318f3dCF7e",
+        pay_to="0x0000000000000000000000000000000000000000",
+        max_amount_required="10000",
+        resource="https://example.com",
+        description="test",
+        max_timeout_seconds=1000,
+        mime_type="text/plain",
+        output_schema={},
+        extra={
+            "name": "USDC",
+            "version": "2",
+        },
+    )
+
+
+@pytest.fixture
+def payment():
+    return PaymentPayload(
+        x402_version=1,
+        scheme="exact",
+        network="base-sepolia",
+        payload=ExactPaymentPayload(
+            signature="0x1234",
+            authorization=EIP3009Authorization(
+                **{
+                    "from": "0x1111111111111111111111111111111111111111",
+                    "to": "0x0000000000000000000000000000000000000000",
+                    "value": "10000",
+                    "validAfter": "0",
+                    "validBefore": "9999999999",
+                    "nonce": "0xabc",
+                }
+            ),
+        ),
+    )
+
+
+def mock_facilitator(handler) -> FacilitatorClient:
+    facilitator = FacilitatorClient({"url": "https://facilitator.test/api/"})
+    facilitator._client = httpx.AsyncClient(
+        base_url=facilitator.config["url"],
+        headers={"Content-Type": "application/json"},
+        transport=httpx.MockTransport(handler),
+    )
+    return facilitator
+
+
+def test_invalid_url():
+    with pytest.raises(ValueError):
+        FacilitatorClient({"url": "ftp://facilitator.test"})
+
+
+async def test_verify_and_settle_share_client(payment, payment_requirements):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path.endswith("/verify"):
+            return httpx.Response(200, json={"isValid": True, "payer": "0x1"})
+        return httpx.Response(
+            200,
+            json={
+                "success": True,
+                "transaction": "0xdead",
+                "network": "base-sepolia",
+                "payer": "0x1",
+            },
+        )
+
+    async with mock_facilitator(handler) as facilitator:
+        verify_response = await facilitator.verify(payment, payment_requirements)
+        settle_response = await facilitator.settle(payment, payment_requirements)
+
+    assert verify_response.is_valid
+    assert settle_response.success
+    assert settle_response.transaction == "0xdead"
+    assert [str(r.url) for r in requests] == [
+        "https://facilitator.test/api/verify",
+        "https://facilitator.test/api/settle",
+    ]
+
+    body = json.loads(requests[0].content)
+    assert body["x402Version"] == 1
+    assert body["paymentPayload"]["scheme"] == "exact"
+    assert body["paymentRequirements"]["maxAmountRequired"] == "10000"
+    assert requests[0].headers["Content-Type"] == "application/json"
+
+    assert facilitator._client.is_closed
+
+
+async def test_verify_with_serialized_requirements(payment, payment_requirements):
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        return httpx.Response(
+            200, json={"isValid": False, "invalidReason": "nope", "payer": None}
+        )
+
+    requirements_dict = payment_requirements.model_dump(
+        by_alias=True, exclude_none=True
+    )
+
+    async with mock_facilitator(handler) as facilitator:
+        verify_response = await facilitator.verify(payment, payment_requirements)
+        verify_response_from_dict = await facilitator.verify(payment, requirements_dict)
+
+    assert not verify_response.is_valid
+    assert verify_response_from_dict.invalid_reason == "nope"
+    assert bodies[0]["paymentRequirements"] == requirements_dict
+    assert bodies[1]["paymentRequirements"] == requirements_dict
+
+
+async def test_keepalive_expiry_override(monkeypatch):
+    monkeypatch.setenv("X402_HTTPX_KEEPALIVE", "60")
+    async with FacilitatorClient({"url": "https://facilitator.test"}) as facilitator:
+        pool = facilitator._client._transport._pool
+        assert pool._keepalive_expiry == 60.0
+        assert pool._max_connections == 100
+
+
+async def test_verify_and_settle(payment, payment_requirements):
+    paths = []
+    header_calls = 0
+
+    async def create_headers():
+        nonlocal header_calls
+        header_calls += 1
+        return {"verify": {"X-Auth": "v"}, "settle": {"X-Auth": "s"}}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append((request.url.path, request.headers["X-Auth"]))
+        if request.url.path.endswith("/verify"):
+            return httpx.Response(200, json={"isValid": True, "payer": "0x1"})
+        return httpx.Response(
+            200,
+            json={"success": True, "network": "base-sepolia", "payer": "0x1"},
+        )
+
+    async with mock_facilitator(handler) as facilitator:
+        facilitator.config["create_headers"] = create_headers
+        verify_response, settle_response = await facilitator.verify_and_settle(
+            payment, payment_requirements
+        )
+
+    assert verify_response.is_valid
+    assert settle_response.success
+    assert paths == [("/api/verify", "v"), ("/api/settle", "s")]
+    assert header_calls == 1
+
+
+async def test_verify_and_settle_skips_invalid_payment(payment, payment_requirements):
+    paths = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        return httpx.Response(
+            200, json={"isValid": False, "invalidReason": "nope", "payer": None}
+        )
+
+    async with mock_facilitator(handler) as facilitator:
+        verify_response, settle_response = await facilitator.verify_and_settle(
+            payment, payment_requirements
+        )
+
+    assert not verify_response.is_valid
+    assert settle_response is None
+    assert paths == ["/api/verify"]
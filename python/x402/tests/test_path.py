@@ -0,0 +1,67 @@
+from x402.path import (
+    _cached_path_matcher,
+    compile_path_dispatcher,
+    compile_path_matcher,
+    path_is_match,
+)
+
+
+def test_compile_path_matcher_globs():
+    matcher = compile_path_matcher(["/api/*/profile", "/files/?.txt", "/exact"])
+    assert matcher("/api/user/profile")
+    assert matcher("/files/a.txt")
+    assert matcher("/exact")
+    assert not matcher("/api/user/settings")
+    assert not matcher("/files/ab.txt")
+
+
+def test_compile_path_dispatcher():
+    dispatcher = compile_path_dispatcher(
+        [
+            ("/api/special", "special"),
+            (["/api/*/profile", "regex:^/users/\\d+$"], "profile"),
+            ("/api/*", "api"),
+            ("*", "fallback"),
+        ]
+    )
+    assert dispatcher("/api/special") == "special"
+    assert dispatcher("/api/user/profile") == "profile"
+    assert dispatcher("/users/123") == "profile"
+    assert dispatcher("/api/user") == "api"
+    assert dispatcher("/other") == "fallback"
+
+
+def test_compile_path_dispatcher_precedence():
+    # Earlier routes win, whatever kind of pattern matched
+    dispatcher = compile_path_dispatcher(
+        [
+            ("/api/*", "prefix"),
+            ("/api/users", "exact"),
+            ("regex:^/api/u", "regex"),
+            ("/a?i/*", "glob"),
+        ]
+    )
+    assert dispatcher("/api/users") == "prefix"
+    assert dispatcher("/abi/users") == "glob"
+
+    dispatcher = compile_path_dispatcher(
+        [("regex:^/api/u", "regex"), ("/a?i/*", "glob"), ("/api/users", "exact")]
+    )
+    assert dispatcher("/api/users") == "regex"
+    assert dispatcher("/api/posts") == "glob"
+
+
+def test_compile_path_dispatcher_no_match():
+    dispatcher = compile_path_dispatcher([("/a", 1), (["/b/*", "/c?"], 2)])
+    assert dispatcher("/d") is None
+    assert dispatcher("/c") is None
+    assert compile_path_dispatcher([])("/a") is None
+
+
+def test_path_is_match_reuses_compiled_patterns():
+    _cached_path_matcher.cache_clear()
+    assert path_is_match(["/api/*", "/exact"], "/api/users")
+    assert path_is_match(["/api/*", "/exact"], "/exact")
+    assert not path_is_match("/api/*", "/other")
+    info = _cached_path_matcher.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
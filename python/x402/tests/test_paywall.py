@@ -95,6 +95,23 @@ class TestCreateX402Config:
         assert config["testnet"] is False
         assert config["amount"] == 0.5
 
+    def test_create_config_with_serialized_requirements(self):
+        payment_req = PaymentRequirements(
+            scheme="exact",
+            network="base",
+            max_amount_required="500000",
+            resource="https://example.com/api/data",
+            description="API data access",
+            mime_type="application/json",
+            pay_to="0x123",
+            max_timeout_seconds=60,
+            asset="0xUSDC",
+        )
+
+        assert create_x402_config(
+            "Payment required", [payment_req.model_dump(by_alias=True)]
+        ) == create_x402_config("Payment required", [payment_req])
+
     def test_create_config_with_paywall_config(self):
         payment_req = PaymentRequirements(
             scheme="exact",
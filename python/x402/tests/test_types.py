@@ -1,3 +1,6 @@
+import pytest
+from pydantic import ValidationError
+
 from x402.types import (
     PaymentRequirements,
     x402PaymentRequiredResponse,
@@ -67,6 +70,21 @@ def test_x402_payment_required_response_serde():
     assert x402PaymentRequiredResponse(**expected) == original
 
 
+def test_integer_string_fields_are_validated():
+    fields = {
+        "from": "0x1",
+        "to": "0x2",
+        "valid_after": "0",
+        "valid_before": "1",
+        "nonce": "0x3",
+    }
+    for value in ["1000000", "-1", " 42 ", "1_000"]:
+        assert EIP3009Authorization(**fields, value=value).value == value
+    for value in ["", "1.5", "abc", "0x10"]:
+        with pytest.raises(ValidationError):
+            EIP3009Authorization(**fields, value=value)
+
+
 def test_eip3009_authorization_serde():
     original = EIP3009Authorization(
         from_="0x123",